@@ -1,72 +1,146 @@
 import os
-import re
 
+import fsspec
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
 
-def clean_patch(patch_text):
+PR_COMMIT_DETAILS_URL = "hf://datasets/hao-li/AIDev/pr_commit_details.parquet"
+
+# Task-4 CSV columns and the pr_commit_details columns they map from
+TASK4_COLUMNS = {
+    "PRID": "pr_id",
+    "PRSHA": "sha",
+    "PRCOMMITMESSAGE": "message",
+    "PRFILE": "filename",
+    "PRSTATUS": "status",
+    "PRADDS": "additions",
+    "PRDELSS": "deletions",
+    "PRCHANGECOUNT": "changes",
+    "PRDIFF": "patch",
+}
+
+# Rows per parquet batch; bounds memory use for the large diff column
+BATCH_SIZE = 100_000
+
+# Everything except printable ASCII and basic whitespace. This also covers
+# null bytes and the BOM, so one pass over the column is enough. Kept as a
+# string: Arrow's regex kernel only runs for a pattern string, a compiled re
+# falls back to re.sub per element.
+SPECIAL_CHARS_PATTERN = r"[^\x20-\x7E\n\r\t]"
+
+
+def clean_patches(patches):
     """
-    Clean data related to patch by removing special characters in the diff
+    Clean data related to patch by removing special characters in the diff.
+    Works on the whole column at once instead of one patch at a time.
     """
-    if pd.isna(patch_text) or patch_text is None:
-        return ""
-
-    patch_str = str(patch_text)
+    patch_str = patches.fillna("").astype(str)
 
     # Keep basic diff symbols but remove other special characters
-    patch_str = re.sub(r"[^\x20-\x7E\n\r\t]", "", patch_str)
+    return patch_str.str.replace(SPECIAL_CHARS_PATTERN, "", regex=True)
 
-    # Additional replacements
-    patch_str = patch_str.replace("\x00", "")  # Remove null bytes
-    patch_str = patch_str.replace("\ufeff", "")  # Remove BOM
 
-    return patch_str
+def build_task4_schema(source_schema):
+    """
+    Arrow schema of the Task-4 CSV, typed from the source parquet columns
+    rather than from whatever pandas infers for a given batch
+    """
+    return pa.schema(
+        [
+            # PRDIFF always holds the cleaned patch text
+            pa.field(
+                column,
+                pa.string() if column == "PRDIFF" else source_schema.field(source).type,
+            )
+            for column, source in TASK4_COLUMNS.items()
+        ]
+    )
+
+
+def build_task4_batch(df):
+    """
+    Map one batch of pr_commit_details rows to the Task-4 columns
+    """
+
+    # Create the new dataframe with the column mappings
+    task4_df = pd.DataFrame(
+        {column: df[source] for column, source in TASK4_COLUMNS.items()}
+    )
+
+    # Remove special characters
+    task4_df["PRDIFF"] = clean_patches(df["patch"])
+
+    return task4_df
 
 
 def task4_process_pr_commit_details():
     """
-    Task 4: Process pr_commit_details data and create CSV with specific column mappings
+    Task 4: Process pr_commit_details data and create CSV with specific column mappings.
+    The parquet file is streamed in batches so memory stays bounded by BATCH_SIZE;
+    returns the number of records written.
     """
 
     try:
         print("Loading PR commit details from Hugging Face dataset...")
 
-        df = pd.read_parquet("hf://datasets/hao-li/AIDev/pr_commit_details.parquet")
-
-        print("Removing special characters from patch")
-
-        # Remove special characters
-        cleaned_patches = df["patch"].apply(clean_patch)
-
-        # Create the new dataframe with the column mappings
-        task4_df = pd.DataFrame(
-            {
-                "PRID": df["pr_id"],
-                "PRSHA": df["sha"],
-                "PRCOMMITMESSAGE": df["message"],
-                "PRFILE": df["filename"],
-                "PRSTATUS": df["status"],
-                "PRADDS": df["additions"],
-                "PRDELSS": df["deletions"],
-                "PRCHANGECOUNT": df["changes"],
-                "PRDIFF": cleaned_patches,
-            }
-        )
-
         # Create output directory if it doesn't exist
         output_dir = "output"
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Save to CSV file
         output_file = os.path.join(output_dir, "task4_pr_commit_details.csv")
-        task4_df.to_csv(output_file, index=False, encoding="utf-8")
+        # Batches go to a temp file that only replaces output_file once the
+        # whole stream has been written, so a failed download never leaves a
+        # truncated CSV behind
+        temp_file = output_file + ".tmp"
+        record_count = 0
+        writer = None
+
+        try:
+            with fsspec.open(PR_COMMIT_DETAILS_URL, "rb") as parquet_source:
+                parquet_file = pq.ParquetFile(parquet_source)
+                schema = build_task4_schema(parquet_file.schema_arrow)
+                batches = parquet_file.iter_batches(
+                    batch_size=BATCH_SIZE, columns=list(TASK4_COLUMNS.values())
+                )
+
+                # Append each batch to the CSV with PyArrow's writer, which is
+                # much faster than to_csv on the PRDIFF text. The writer is
+                # opened up front so an empty source still writes the header.
+                writer = pa_csv.CSVWriter(temp_file, schema)
+
+                print("Removing special characters from patch")
+
+                for batch in batches:
+                    task4_df = build_task4_batch(batch.to_pandas())
+                    writer.write_table(
+                        pa.Table.from_pandas(
+                            task4_df, schema=schema, preserve_index=False
+                        )
+                    )
+
+                    record_count += len(task4_df)
+
+            writer.close()
+            writer = None
+            os.replace(temp_file, output_file)
+        except Exception:
+            try:
+                if writer is not None:
+                    writer.close()
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            raise
 
         print("Task 4 completed successfully")
         print(f"Output saved to: {output_file}")
-        print(f"Number of records processed: {len(task4_df)}")
+        print(f"Number of records processed: {record_count}")
 
-        return task4_df
+        return record_count
 
     except Exception as e:
         print(f"Error processing Task 4: {str(e)}")
@@ -2,6 +2,8 @@ import os
 import re
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
 
 def build_security_pattern():
@@ -58,6 +60,24 @@ def build_security_pattern():
     return re.compile(pattern_str, flags=re.IGNORECASE)
 
 
+def read_csv_arrow(csv_file, column_types):
+    """
+    Read only the given columns of a CSV with PyArrow's multi-threaded reader.
+    String columns stay Arrow-backed so the .str operations run on Arrow kernels.
+    """
+    table = pa_csv.read_csv(
+        csv_file,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        # Titles and bodies can contain quoted newlines
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(column_types),
+            column_types={k: v for k, v in column_types.items() if v is not None},
+        ),
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
 def task5_process_security_flags():
     """
     Task 5:
@@ -82,44 +102,66 @@ def task5_process_security_flags():
         print(f"Loading Task-1 CSV from: {task1_file}")
         print(f"Loading Task-3 CSV from: {task3_file}")
 
-        task1_df = pd.read_csv(task1_file)
-        task3_df = pd.read_csv(task3_file)
+        # Only load the columns Task-5 actually uses. IDs are read as int64
+        # up front so both sides join on numeric keys without a later cast.
+        task1_df = read_csv_arrow(
+            task1_file,
+            {
+                "ID": pa.int64(),
+                "TITLE": pa.string(),
+                "AGENTNAME": pa.string(),
+                "BODYSTRING": pa.string(),
+            },
+        )
+        task3_df = read_csv_arrow(
+            task3_file,
+            {"PRID": pa.int64(), "PRTYPE": pa.string(), "CONFIDENCE": None},
+        )
+
+        # Few distinct agents and PR types: store them as categories
+        task1_df["AGENTNAME"] = task1_df["AGENTNAME"].astype("category")
+        task3_df["PRTYPE"] = task3_df["PRTYPE"].astype("category")
 
         # Sanity info
         print(f"Task-1 records: {len(task1_df)}")
         print(f"Task-3 records: {len(task3_df)}")
 
-        # Make sure IDs are comparable and are cast to both as a string
-        task1_df["ID"] = task1_df["ID"].astype(str)
-        task3_df["PRID"] = task3_df["PRID"].astype(str)
-
-        # Merge on PR ID
-        print("Merging Task-1 and Task-3 data on ID/PRID...")
-        merged = task1_df.merge(
-            task3_df[["PRID", "PRTYPE", "CONFIDENCE"]],
-            left_on="ID",
-            right_on="PRID",
-            how="inner",
-        )
-
-        print(f"Number of merged records: {len(merged)}")
-
-        # No longer need the PRID 
-        merged = merged.drop(columns=["PRID"])
+        # Only PRs that also appear in Task-3 end up in the output, so only
+        # those titles and bodies need to be scanned
+        task1_df = task1_df[task1_df["ID"].isin(task3_df["PRID"])]
 
         # Prepare text to scan: TITLE + BODYSTRING
-        merged["TITLE"] = merged["TITLE"].fillna("")
-        merged["BODYSTRING"] = merged["BODYSTRING"].fillna("")
-        combined_text = merged["TITLE"] + " " + merged["BODYSTRING"]
+        combined_text = (
+            task1_df["TITLE"].fillna("") + " " + task1_df["BODYSTRING"].fillna("")
+        )
 
         # Build keyword pattern and compute SECURITY flag
         security_pattern = build_security_pattern()
         print("Computing SECURITY flag based on keyword scan of title + body...")
 
-        merged["SECURITY"] = combined_text.str.contains(
-            security_pattern,
+        # Arrow's regex kernel takes the pattern string, not a compiled re.
+        # The flag is only ever 0/1, so int8 is enough.
+        security = combined_text.str.contains(
+            security_pattern.pattern,
+            case=False,
             na=False,
-        ).astype(int)
+        ).astype("int8")
+        security.name = "SECURITY"
+
+        # Drop the title/body text before merging so it is not copied
+        # through the join
+        task1_df = pd.concat([task1_df[["ID", "AGENTNAME"]], security], axis=1)
+
+        # Join on PR ID against Task-3 indexed by PRID
+        print("Merging Task-1 and Task-3 data on ID/PRID...")
+        merged = task1_df.join(
+            task3_df.set_index("PRID")[["PRTYPE", "CONFIDENCE"]],
+            on="ID",
+            how="inner",
+            validate="one_to_one",
+        )
+
+        print(f"Number of merged records: {len(merged)}")
 
         # Build final Task-5 dataframe with required columns
         task5_df = merged[